@@ -0,0 +1,75 @@
+"""Compare per cipher suite throughput of the crypto backends.
+
+Usage: PYTHONPATH=. python benchmarks/bench_backend.py
+"""
+
+import timeit
+from collections import OrderedDict
+
+from opentoken import _backend, _ciphersuite, _token
+
+PAYLOAD = OrderedDict([
+    ("subject", "foobar"),
+    ("foo", "bar"),
+    ("bar", "baz"),
+])
+NUMBER = 2000
+BLOCK = b"x" * 1024
+KEYS = {1: b"k" * 32, 2: b"k" * 16, 3: b"abcdefgh12345678ABCDEFGH"}
+IVS = {1: b"i" * 16, 2: b"i" * 16, 3: b"i" * 8}
+
+
+def main():
+    print("{0:<14}{1:<7}{2:>14}{3:>14}{4:>14}{5:>14}".format(
+        "backend", "suite", "cbc KiB/s", "derive/s", "encode/s", "decode/s"
+    ))
+    for name in sorted(_backend.BACKENDS):
+        try:
+            backend = _backend.get_backend(name)
+        except ImportError:
+            print("{0:<14}not installed".format(name))
+            continue
+        for cipher_suite_id in (1, 2, 3):
+            password = "testPassword"
+            otk = None
+            if cipher_suite_id != 3:
+                otk = _token.encode(
+                    PAYLOAD, cipher_suite_id, password, backend=backend
+                )
+            derive = timeit.timeit(
+                lambda: _ciphersuite.generate_key(
+                    password, cipher_suite_id, backend=backend
+                ),
+                number=NUMBER
+            )
+            cipher = _ciphersuite.CIPHERS[cipher_suite_id]["cipher"]
+            cbc = timeit.timeit(
+                lambda: backend.encrypt(
+                    cipher, KEYS[cipher_suite_id], IVS[cipher_suite_id], BLOCK
+                ),
+                number=NUMBER
+            )
+            results = [NUMBER / cbc, NUMBER / derive]
+            if otk is None:
+                #: PBKDF2 derives 21 byte keys, which 3DES does not accept
+                results.extend([float("nan")] * 2)
+            else:
+                encode = timeit.timeit(
+                    lambda: _token.encode(
+                        PAYLOAD, cipher_suite_id, password, backend=backend
+                    ),
+                    number=NUMBER
+                )
+                decode = timeit.timeit(
+                    lambda: _token.decode(
+                        otk, cipher_suite_id, password, backend=backend
+                    ),
+                    number=NUMBER
+                )
+                results.extend([NUMBER / encode, NUMBER / decode])
+            row = "{:<14}{:<7}" + "{:>14.0f}" * len(results)
+            print(row.format(name, cipher_suite_id, *results))
+
+
+if __name__ == "__main__":
+    main()
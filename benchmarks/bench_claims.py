@@ -0,0 +1,52 @@
+"""Compare the per-token memory footprint of OrderedDict and Claims.
+
+Usage: PYTHONPATH=. python benchmarks/bench_claims.py
+"""
+
+import gc
+import tracemalloc
+from collections import OrderedDict
+
+from opentoken import Claims, OpenToken, _token
+
+TOKENS = 10000
+
+
+def measure(otk, otkapi, object_pairs_hook):
+    key = otkapi._get_key()
+    gc.collect()
+    tracemalloc.start()
+    cache = [
+        _token.decode(
+            otk, otkapi.cipher_suite_id, key=key,
+            object_pairs_hook=object_pairs_hook
+        )
+        for _ in range(TOKENS)
+    ]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cache
+    return size / TOKENS
+
+
+def main():
+    otkapi = OpenToken("testPassword")
+    print("{0:<8}{1:>16}{2:>16}".format(
+        "claims", "OrderedDict B", "Claims B"
+    ))
+    for extra in (0, 5, 20):
+        pairs = [("subject", "jdoe@example.com")]
+        pairs.extend(
+            ("attribute{0}".format(i), "value{0}".format(i))
+            for i in range(extra)
+        )
+        otk = otkapi.create_token(pairs)
+        print("{0:<8}{1:>16.0f}{2:>16.0f}".format(
+            extra + 4,
+            measure(otk, otkapi, OrderedDict),
+            measure(otk, otkapi, Claims),
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Report the CPU cost and token size of compression policies.
+
+Usage: PYTHONPATH=. python benchmarks/bench_compression.py
+"""
+
+import timeit
+import zlib
+from collections import OrderedDict
+
+from opentoken import CompressionPolicy, _token, _utils
+
+NUMBER = 500
+
+POLICIES = [
+    ("default", CompressionPolicy()),
+    ("level=0", CompressionPolicy(level=0)),
+    ("level=1", CompressionPolicy(level=1)),
+    ("level=9", CompressionPolicy(level=9)),
+    ("level=9 mem=9", CompressionPolicy(level=9, mem_level=9)),
+    ("level=6 wbits=10", CompressionPolicy(level=6, wbits=10)),
+    ("sized", CompressionPolicy(level=9, size_levels=[(128, 1)])),
+]
+
+
+def make_payload(entitlements):
+    payload = OrderedDict([
+        ("subject", "jdoe@example.com"),
+        ("not-before", "2020-01-01T00:00:00Z"),
+        ("not-on-or-after", "2020-01-01T00:05:00Z"),
+        ("renew-until", "2020-01-01T12:00:00Z"),
+    ])
+    for i in range(entitlements):
+        payload["entitlement{0}".format(i)] = (
+            "urn:example:app{0}:role:{1}".format(i % 37, i % 5)
+        )
+    return payload
+
+
+def main():
+    print("{0:<18}{1:>10}{2:>12}{3:>14}".format(
+        "policy", "claims", "token len", "usec/compress"
+    ))
+    for entitlements in (0, 50, 1000):
+        payload = make_payload(entitlements)
+        data = bytes(_utils.ordered_dict_to_otk_str(payload), "utf-8")
+
+        #: Baseline, the plain zlib.compress call the policies replace
+        token = _token.encode(payload, 2, "testPassword")
+        seconds = timeit.timeit(lambda: zlib.compress(data), number=NUMBER)
+        print("{0:<18}{1:>10}{2:>12}{3:>14.1f}".format(
+            "zlib.compress", len(payload), len(token),
+            seconds / NUMBER * 1e6
+        ))
+
+        for name, policy in POLICIES:
+            token = _token.encode(
+                payload, 2, "testPassword", compression=policy
+            )
+            seconds = timeit.timeit(
+                lambda: policy.compress(data), number=NUMBER
+            )
+            print("{0:<18}{1:>10}{2:>12}{3:>14.1f}".format(
+                name, len(payload), len(token), seconds / NUMBER * 1e6
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare verified token cache hit rates across forked workers.
+
+Each worker parses requests drawn at random from a shared pool of tokens,
+as a prefork server would. A per-process cache only hits when the same
+worker sees a token twice; the shared cache hits whenever any worker has
+already verified it.
+
+Usage: PYTHONPATH=. python benchmarks/bench_shared_cache.py
+"""
+
+import multiprocessing
+import random
+import time
+
+from opentoken import OpenToken, SharedTokenCache
+
+WORKERS = 8
+TOKENS = 500
+REQUESTS = 2000
+
+
+def worker(tokens, shared_cache, seed, results):
+    cache = shared_cache or SharedTokenCache(slots=4096)
+    otkapi = OpenToken("testPassword", verified_cache=cache)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        otkapi.parse_token(rng.choice(tokens))
+    results.put((cache.hits, cache.misses, time.perf_counter() - start))
+
+
+def run(tokens, shared_cache):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=worker, args=(tokens, shared_cache, seed, results)
+        )
+        for seed in range(WORKERS)
+    ]
+    for process in workers:
+        process.start()
+    stats = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    hits = sum(hit for hit, _, _ in stats)
+    misses = sum(miss for _, miss, _ in stats)
+    rate = sum(REQUESTS / seconds for _, _, seconds in stats) / WORKERS
+    return hits / (hits + misses), rate
+
+
+def main():
+    otkapi = OpenToken("testPassword")
+    tokens = [
+        otkapi.create_token([("subject", "user{0}".format(i))])
+        for i in range(TOKENS)
+    ]
+    print("{0} workers, {1} tokens, {2} requests per worker".format(
+        WORKERS, TOKENS, REQUESTS
+    ))
+    print("{0:<14}{1:>10}{2:>18}".format(
+        "cache", "hit rate", "parses/s/worker"
+    ))
+    for name, shared_cache in (
+        ("per-process", None),
+        ("shared", SharedTokenCache(slots=4096)),
+    ):
+        hit_rate, rate = run(tokens, shared_cache)
+        print("{0:<14}{1:>10.1%}{2:>18.0f}".format(name, hit_rate, rate))
+
+
+if __name__ == "__main__":
+    main()
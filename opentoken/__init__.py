@@ -1 +1,7 @@
 from .opentoken import OpenToken
+from ._claims import Claims
+from ._compression import CompressionPolicy
+from ._issuance import IssuanceCache
+from ._registry import OpenTokenRegistry
+from ._replay import ReplayBackend, MemoryReplayIndex
+from ._shared_cache import SharedTokenCache
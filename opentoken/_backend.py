@@ -0,0 +1,208 @@
+"""Crypto backend helper module
+
+Every backend exposes the same primitives so that tokens encoded with one
+backend decode with any other.
+"""
+
+import hashlib
+import hmac
+
+from Cryptodome.Cipher import AES, DES3
+from Cryptodome.Hash import SHA1, HMAC
+from Cryptodome.Protocol.KDF import PBKDF2
+from Cryptodome.Util.Padding import pad, unpad
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import padding as _padding
+    from cryptography.hazmat.primitives.ciphers import (
+        Cipher as _Cipher, algorithms as _algorithms, modes as _modes
+    )
+    try:
+        from cryptography.hazmat.decrepit.ciphers.algorithms import TripleDES
+    except ImportError:
+        TripleDES = _algorithms.TripleDES
+except ImportError:  # pragma: no cover
+    _Cipher = None
+
+#: PBKDF2 iteration count mandated by the OpenToken draft
+PBKDF2_ITERATIONS = 1000
+
+
+class CryptoBackend:
+    """Interface for the primitives used to encode and decode OpenTokens."""
+
+    name = None
+
+    def derive_key(self, password, salt, key_length):
+        """Derive a key with PBKDF2-HMAC-SHA1.
+
+        Args:
+            password (str or bytes): Password to derive the key from.
+            salt (bytes): Salt.
+            key_length (int): Length of the derived key in bytes.
+
+        Returns:
+            bytes: The derived key.
+
+        """
+        raise NotImplementedError
+
+    def new_hmac(self, key):
+        """Create a SHA-1 HMAC object, or a plain SHA-1 hash if key is None.
+
+        Args:
+            key (bytes): HMAC key.
+
+        Returns:
+            An object providing ``update``, ``digest`` and ``hexdigest``.
+
+        """
+        raise NotImplementedError
+
+    def encrypt(self, cipher, key, iv, data):
+        """Pad and encrypt data in CBC mode.
+
+        Args:
+            cipher (str): Cipher name, "AES" or "3DES".
+            key (bytes): Encryption key.
+            iv (bytes): Initialization vector.
+            data (bytes): Plain text.
+
+        Returns:
+            bytes: The PKCS 5 padded cipher text.
+
+        """
+        raise NotImplementedError
+
+    def decrypt(self, cipher, key, iv, data):
+        """Decrypt and unpad CBC mode cipher text.
+
+        Args:
+            cipher (str): Cipher name, "AES" or "3DES".
+            key (bytes): Decryption key.
+            iv (bytes): Initialization vector.
+            data (bytes): Cipher text.
+
+        Returns:
+            bytes: The plain text.
+
+        Raises:
+            ValueError: If the cipher text or its padding is invalid.
+
+        """
+        raise NotImplementedError
+
+
+class PycryptodomeBackend(CryptoBackend):
+    """Backend built on pycryptodomex."""
+
+    name = "pycryptodome"
+
+    def derive_key(self, password, salt, key_length):
+        return PBKDF2(
+            password, salt, dkLen=key_length, count=PBKDF2_ITERATIONS
+        )
+
+    def new_hmac(self, key):
+        if key is None:
+            return SHA1.new()
+        return HMAC.new(key, digestmod=SHA1)
+
+    def encrypt(self, cipher, key, iv, data):
+        cipher_type = DES3 if cipher == "3DES" else AES
+        cipher = cipher_type.new(key, cipher_type.MODE_CBC, iv=iv)
+        return cipher.encrypt(pad(data, cipher_type.block_size))
+
+    def decrypt(self, cipher, key, iv, data):
+        cipher_type = DES3 if cipher == "3DES" else AES
+        cipher = cipher_type.new(key, cipher_type.MODE_CBC, iv=iv)
+        return unpad(cipher.decrypt(data), cipher_type.block_size)
+
+
+class CryptographyBackend(CryptoBackend):
+    """Backend built on the OpenSSL bindings of the cryptography package.
+
+    Hashing and key derivation use :mod:`hashlib`, which is backed by the
+    same OpenSSL library.
+
+    """
+
+    name = "cryptography"
+
+    def __init__(self):
+        if _Cipher is None:
+            raise ImportError(
+                "The cryptography package is required for this backend."
+            )
+        self._backend = default_backend()
+
+    def derive_key(self, password, salt, key_length):
+        if isinstance(password, str):
+            #: Matches the pycryptodome encoding of str passwords
+            password = password.encode("latin-1")
+        return hashlib.pbkdf2_hmac(
+            "sha1", password, bytes(salt), PBKDF2_ITERATIONS, key_length
+        )
+
+    def new_hmac(self, key):
+        if key is None:
+            return hashlib.sha1()
+        return hmac.new(key, digestmod=hashlib.sha1)
+
+    def _cipher(self, cipher, key, iv):
+        if cipher == "3DES":
+            algorithm = TripleDES(key)
+        else:
+            algorithm = _algorithms.AES(key)
+        return _Cipher(
+            algorithm, _modes.CBC(bytes(iv)), backend=self._backend
+        ), algorithm.block_size
+
+    def encrypt(self, cipher, key, iv, data):
+        cipher, block_size = self._cipher(cipher, key, iv)
+        padder = _padding.PKCS7(block_size).padder()
+        encryptor = cipher.encryptor()
+        padded = padder.update(bytes(data)) + padder.finalize()
+        return encryptor.update(padded) + encryptor.finalize()
+
+    def decrypt(self, cipher, key, iv, data):
+        cipher, block_size = self._cipher(cipher, key, iv)
+        unpadder = _padding.PKCS7(block_size).unpadder()
+        decryptor = cipher.decryptor()
+        padded = decryptor.update(bytes(data)) + decryptor.finalize()
+        return unpadder.update(padded) + unpadder.finalize()
+
+
+BACKENDS = {
+    PycryptodomeBackend.name: PycryptodomeBackend,
+    CryptographyBackend.name: CryptographyBackend,
+}
+
+_instances = {}
+
+
+def get_backend(backend=None):
+    """Resolve a crypto backend.
+
+    Args:
+        backend (str or CryptoBackend): Backend name or instance. If None,
+            the cryptography backend is used when installed, falling back
+            to pycryptodome.
+
+    Returns:
+        CryptoBackend: The backend instance.
+
+    """
+    if isinstance(backend, CryptoBackend):
+        return backend
+    if backend is None:
+        backend = (
+            CryptographyBackend.name if _Cipher is not None
+            else PycryptodomeBackend.name
+        )
+    if backend not in _instances:
+        if backend not in BACKENDS:
+            raise ValueError("Unknown crypto backend: {0}".format(backend))
+        _instances[backend] = BACKENDS[backend]()
+    return _instances[backend]
@@ -1,9 +1,7 @@
 """CipherSuite helper module
 """
 
-from Cryptodome.Protocol.KDF import PBKDF2
-
-from . import _utils
+from . import _backend, _utils
 
 CIPHERS = [
     {
@@ -45,7 +43,7 @@ CIPHERS = [
 ]
 
 
-def generate_key(password, cipher_suite_id, salt=None):
+def generate_key(password, cipher_suite_id, salt=None, backend=None):
     password = _utils.validate_password(password)
     cipher_suite_id = _utils.validate_cipher_suite_id(cipher_suite_id)
 
@@ -55,8 +53,8 @@ def generate_key(password, cipher_suite_id, salt=None):
     salt = salt or bytearray([0x0, 0x0, 0x0, 0x0, 0x0, 0x0, 0x0, 0x0])
     cipher_suite = CIPHERS[cipher_suite_id]
 
-    return PBKDF2(
+    return _backend.get_backend(backend).derive_key(
         password,
         salt,
-        dkLen=cipher_suite["key_size"] // 8,
+        cipher_suite["key_size"] // 8,
     )
@@ -0,0 +1,121 @@
+"""Compact claims representation
+"""
+
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import dateutil.parser
+
+TIMESTAMP_CLAIMS = ("not-before", "not-on-or-after", "renew-until")
+
+#: Claim name layouts shared between Claims instances
+_SCHEMAS = {}
+_MAX_SCHEMAS = 4096
+
+
+def parse_timestamp(value):
+    """Convert an OpenToken timestamp to an epoch timestamp.
+
+    Args:
+        value (str): ISO 8601 timestamp, e.g. "2020-01-02T03:04:05Z".
+
+    Returns:
+        float: Seconds since the epoch.
+
+    """
+    return dateutil.parser.isoparse(value).timestamp()
+
+
+def timestamps(claims):
+    """Return the epoch timestamps of a claim set.
+
+    Args:
+        claims (Mapping): Claims or OrderedDict of token claims.
+
+    Returns:
+        tuple: The "not-before", "not-on-or-after" and "renew-until" epoch
+        timestamps.
+
+    """
+    if isinstance(claims, Claims):
+        epochs = (
+            claims.not_before, claims.not_on_or_after, claims.renew_until
+        )
+        if None not in epochs:
+            return epochs
+    return tuple(parse_timestamp(claims[name]) for name in TIMESTAMP_CLAIMS)
+
+
+def _schema(keys):
+    schema = _SCHEMAS.get(keys)
+    if schema is None:
+        keys = tuple(
+            sys.intern(key) if type(key) is str else key for key in keys
+        )
+        schema = (keys, {key: i for i, key in enumerate(keys)})
+        if len(_SCHEMAS) < _MAX_SCHEMAS:
+            _SCHEMAS[keys] = schema
+    return schema
+
+
+class Claims(Mapping):
+    """Read-only, memory-efficient mapping of token claims.
+
+    Values are held in a single tuple, while claim names and their lookup
+    table are interned and shared by every Claims instance with the same
+    claim layout. The token timestamps are parsed once into epoch
+    attributes, which are None when the claim is absent.
+
+    Args:
+        pairs (iterable): Key-value claim pairs.
+
+    """
+
+    __slots__ = (
+        "_keys", "_index", "_values", "not_before", "not_on_or_after",
+        "renew_until"
+    )
+
+    def __init__(self, pairs=()):
+        if isinstance(pairs, Mapping):
+            pairs = pairs.items()
+        pairs = tuple(pairs)
+        keys = tuple(key for key, _ in pairs)
+        if len(set(keys)) != len(keys):
+            #: Keep the OrderedDict semantics for repeated claims
+            pairs = tuple(OrderedDict(pairs).items())
+            keys = tuple(key for key, _ in pairs)
+
+        self._keys, self._index = _schema(keys)
+        self._values = tuple(value for _, value in pairs)
+
+        epochs = []
+        for name in TIMESTAMP_CLAIMS:
+            i = self._index.get(name)
+            epochs.append(
+                None if i is None else parse_timestamp(self._values[i])
+            )
+        self.not_before, self.not_on_or_after, self.renew_until = epochs
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return "Claims({0!r})".format(list(self.items()))
+
+    def __reduce__(self):
+        return (Claims, (tuple(zip(self._keys, self._values)),))
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
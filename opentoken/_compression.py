@@ -0,0 +1,75 @@
+"""Payload compression helper module
+"""
+
+import zlib
+
+
+class CompressionPolicy:
+    """Controls how token payloads are compressed.
+
+    Output is always a zlib stream (RFC 1950), so tokens remain readable
+    by any OpenToken implementation regardless of the policy used.
+
+    Args:
+        level (int): zlib compression level, -1 to 9.
+        mem_level (int): zlib memory level, 1 to 9.
+        wbits (int): Base two logarithm of the window size, 9 to 15.
+        size_levels (list): Optional (max_size, level) tuples. A payload of
+            at most max_size bytes is compressed at the matching level;
+            larger payloads use ``level``.
+
+    """
+
+    def __init__(self, level=-1, mem_level=8, wbits=15, size_levels=None):
+        size_levels = sorted(size_levels or [])
+        for compress_level in [level] + [lv for _, lv in size_levels]:
+            if not -1 <= compress_level <= 9:
+                raise ValueError("level must be between -1 and 9.")
+        if not 1 <= mem_level <= 9:
+            raise ValueError("mem_level must be between 1 and 9.")
+        if not 9 <= wbits <= 15:
+            #: Other wbits values produce raw deflate or gzip streams
+            raise ValueError("wbits must be between 9 and 15.")
+        self.level = level
+        self.mem_level = mem_level
+        self.wbits = wbits
+        self.size_levels = size_levels
+        self._zlib_defaults = (
+            wbits == zlib.MAX_WBITS and mem_level == zlib.DEF_MEM_LEVEL
+        )
+
+    def level_for(self, size):
+        """Select the compression level for a payload.
+
+        Args:
+            size (int): Payload size in bytes.
+
+        Returns:
+            int: The zlib compression level.
+
+        """
+        for max_size, level in self.size_levels:
+            if size <= max_size:
+                return level
+        return self.level
+
+    def compress(self, data):
+        """Compress a payload.
+
+        Args:
+            data (bytes): Uncompressed payload.
+
+        Returns:
+            bytes: zlib compressed payload.
+
+        """
+        level = self.level_for(len(data))
+        if self._zlib_defaults:
+            return zlib.compress(data, level)
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, self.wbits, self.mem_level
+        )
+        return compressor.compress(data) + compressor.flush()
+
+
+DEFAULT_POLICY = CompressionPolicy()
@@ -0,0 +1,101 @@
+"""Issued token cache
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class IssuanceCache:
+    """Reuses freshly minted tokens for identical claim sets.
+
+    A cached token is returned while at least ``min_remaining`` of its
+    lifetime is left. Entries are kept in issuance order, so with a fixed
+    token lifetime the oldest entry is always the first to go stale and
+    eviction only ever looks at the front of the cache.
+
+    Args:
+        max_size (int): Maximum number of cached tokens.
+        min_remaining (float): Fraction of the token lifetime, 0 to 1, that
+            must remain for a cached token to be reused.
+        clock (callable): Function returning the current epoch time.
+
+    """
+
+    def __init__(self, max_size=1024, min_remaining=0.5, clock=time.time):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        if not 0 <= min_remaining <= 1:
+            raise ValueError("min_remaining must be between 0 and 1.")
+        self.max_size = max_size
+        self.min_remaining = min_remaining
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """float: Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        """Return a reusable token for a claim set.
+
+        Args:
+            key (tuple): Hashable claim set key.
+
+        Returns:
+            str: The cached token, or None on a miss.
+
+        """
+        with self._lock:
+            now = self._clock()
+            self._evict_stale(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, token, issued_at, expires_at):
+        """Cache a freshly minted token.
+
+        Args:
+            key (tuple): Hashable claim set key.
+            token (str): The token string.
+            issued_at (float): Epoch timestamp of "not-before".
+            expires_at (float): Epoch timestamp of "not-on-or-after".
+
+        """
+        reuse_until = expires_at - self.min_remaining * (
+            expires_at - issued_at
+        )
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (token, reuse_until)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached tokens and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _evict_stale(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[1] > now:
+                break
+            del self._entries[key]
@@ -0,0 +1,211 @@
+"""Multi-tenant OpenToken registry
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from . import _token, _utils
+from .opentoken import OpenToken
+
+
+class OpenTokenRegistry:
+    """Holds OpenToken configurations for many partner connections.
+
+    Incoming tokens are routed to a tenant by the cipher suite id and key
+    info in the token header, so no trial decryption is needed. Tenant keys
+    are derived on first use and only the ``max_derived_keys`` most recently
+    used tenants keep theirs.
+
+    Args:
+        max_derived_keys (int): Number of tenants whose derived keys are
+            kept in memory.
+
+    """
+
+    def __init__(self, max_derived_keys=128):
+        if max_derived_keys < 1:
+            raise ValueError("max_derived_keys must be at least 1.")
+        self.max_derived_keys = max_derived_keys
+        self.unmatched = 0
+        self._tenants = {}
+        self._routes = {}
+        self._stats = {}
+        self._warm = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def __contains__(self, name):
+        return name in self._tenants
+
+    def register(self, name, password=None, cipher_suite_id=2, key_info=None,
+                 **kwargs):
+        """Register a tenant connection.
+
+        Args:
+            name (str): Tenant name.
+            password (str): Password used for encryption/decryption.
+            cipher_suite_id (int): Cipher suite id.
+            key_info (str or bytes): Key info identifying the tenant in
+                token headers.
+            **kwargs: Other :class:`OpenToken` arguments.
+
+        Returns:
+            OpenToken: The tenant's OpenToken instance.
+
+        """
+        cipher_suite_id = _utils.validate_cipher_suite_id(cipher_suite_id)
+        route = (cipher_suite_id, _utils.validate_key_info(key_info))
+        with self._lock:
+            if name in self._tenants:
+                raise ValueError(
+                    "Tenant '{0}' is already registered.".format(name)
+                )
+            if route in self._routes:
+                raise ValueError(
+                    "Tenant '{0}' already uses cipher suite {1} with key "
+                    "info {2!r}.".format(self._routes[route], *route)
+                )
+            otkapi = OpenToken(
+                password=password, cipher_suite_id=cipher_suite_id,
+                key_info=key_info, **kwargs
+            )
+            self._tenants[name] = otkapi
+            self._routes[route] = name
+            self._stats[name] = {
+                "parsed": 0, "created": 0, "errors": 0, "seconds": 0.0
+            }
+        return otkapi
+
+    def unregister(self, name):
+        """Remove a tenant connection.
+
+        Args:
+            name (str): Tenant name.
+
+        """
+        with self._lock:
+            otkapi = self._tenants.pop(name)
+            route = (
+                otkapi.cipher_suite_id,
+                _utils.validate_key_info(otkapi.key_info)
+            )
+            del self._routes[route]
+            del self._stats[name]
+            self._warm.pop(name, None)
+
+    def get(self, name):
+        """Return the OpenToken instance of a tenant.
+
+        Args:
+            name (str): Tenant name.
+
+        Returns:
+            OpenToken: The tenant's OpenToken instance.
+
+        """
+        return self._tenants[name]
+
+    def resolve(self, otk_str):
+        """Find the tenant a token belongs to from its header.
+
+        Args:
+            otk_str (str): The raw base64 encoded token string.
+
+        Returns:
+            str: The tenant name.
+
+        """
+        try:
+            route = _token.read_header(otk_str)
+            name = self._routes.get(route)
+            if name is None:
+                raise ValueError(
+                    "No tenant registered for cipher suite {0} with key "
+                    "info {1!r}.".format(*route)
+                )
+        except Exception:
+            with self._lock:
+                self.unmatched += 1
+            raise
+        return name
+
+    def parse_token(self, otk_str):
+        """Parse an OpenToken using the tenant it is addressed to.
+
+        Args:
+            otk_str (str): The raw base64 encoded token string.
+
+        Returns:
+            tuple: The tenant name and the key-value token pairs.
+
+        """
+        name = self.resolve(otk_str)
+        return name, self._call(name, "parsed", "parse_token", otk_str)
+
+    def create_token(self, name, otk_pairs):
+        """Create an OpenToken for a tenant.
+
+        Args:
+            name (str): Tenant name.
+            otk_pairs (list): The key-value token pairs as a list of tuples.
+
+        Returns:
+            str: The raw base64 encoded token string.
+
+        """
+        return self._call(name, "created", "create_token", otk_pairs)
+
+    def stats(self):
+        """Report per-tenant counters.
+
+        Returns:
+            dict: Tenant name to a dict of "parsed", "created" and "errors"
+            counts, "seconds" spent and "throughput" in tokens per second.
+
+        """
+        with self._lock:
+            report = {}
+            for name, counters in self._stats.items():
+                counters = dict(counters)
+                calls = counters["parsed"] + counters["created"]
+                counters["throughput"] = (
+                    calls / counters["seconds"] if counters["seconds"] else 0.0
+                )
+                report[name] = counters
+            return report
+
+    def _call(self, name, counter, method, arg):
+        otkapi = self._tenants[name]
+        self._touch(name)
+        start = time.perf_counter()
+        try:
+            result = getattr(otkapi, method)(arg)
+        except Exception:
+            self._record(name, "errors", start)
+            raise
+        self._record(name, counter, start)
+        return result
+
+    def _record(self, name, counter, start):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            counters = self._stats.get(name)
+            if counters is not None:
+                counters[counter] += 1
+                counters["seconds"] += elapsed
+
+    def _touch(self, name):
+        """Mark a tenant as recently used and drop the derived keys of the
+        coldest tenants.
+        """
+        with self._lock:
+            if name in self._warm:
+                self._warm.move_to_end(name)
+                return
+            self._warm[name] = True
+            while len(self._warm) > self.max_derived_keys:
+                cold, _ = self._warm.popitem(last=False)
+                self._tenants[cold]._clear_key()
@@ -0,0 +1,149 @@
+"""Replay detection helpers
+"""
+
+import heapq
+import threading
+import time
+
+
+class ReplayBackend:
+    """Interface for OpenToken replay indexes.
+
+    A backend remembers which tokens have already been seen until they
+    expire. Implementations backed by a shared store only need to provide
+    an atomic ``check_and_add``.
+
+    """
+
+    def check_and_add(self, key, expires_at):
+        """Record a token key unless it has already been seen.
+
+        Args:
+            key (str): Replay key of the token.
+            expires_at (float): Epoch timestamp after which the key may be
+                forgotten.
+
+        Returns:
+            bool: True if the key was new, False if it is a replay.
+
+        Raises:
+            ValueError: If the key cannot be recorded, in which case the
+                token must be rejected.
+
+        """
+        raise NotImplementedError
+
+
+class MemoryReplayIndex(ReplayBackend):
+    """In-process replay index with time-bucketed expiry.
+
+    Keys are grouped into buckets of ``bucket_seconds`` by expiry time, and
+    whole buckets are dropped once they have expired, so eviction costs
+    O(1) amortized per key.
+
+    When ``max_entries`` keys that have not expired are held, ``on_full``
+    decides what happens to a new key. "reject" raises ValueError so the
+    token is refused. "evict" drops the bucket closest to expiry to make
+    room, which fails open: tokens in that bucket are still valid and can
+    be replayed, and a client able to obtain many fresh tokens can flush
+    the index on purpose.
+
+    Args:
+        bucket_seconds (int): Width of an expiry bucket in seconds.
+        max_entries (int): Maximum number of keys to hold, or None for no
+            limit.
+        on_full (str): "reject" or "evict".
+        clock (callable): Function returning the current epoch time.
+
+    """
+
+    def __init__(self, bucket_seconds=10, max_entries=None, on_full="reject",
+                 clock=time.time):
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive.")
+        if on_full not in ("reject", "evict"):
+            raise ValueError("on_full must be 'reject' or 'evict'.")
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self.on_full = on_full
+        self._clock = clock
+        self._expiry = {}
+        self._buckets = {}
+        self._bucket_heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def __contains__(self, key):
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+            return self._expiry.get(key, now) > now
+
+    def check_and_add(self, key, expires_at):
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+
+            #: A key can outlive its expiry until its bucket is dropped
+            if self._expiry.get(key, now) > now:
+                return False
+            self._expiry.pop(key, None)
+            if expires_at <= now:
+                return True
+
+            if self.max_entries is not None and (
+                len(self._expiry) >= self.max_entries
+            ):
+                self._make_room(now)
+
+            bucket_id = int(expires_at // self.bucket_seconds)
+            bucket = self._buckets.get(bucket_id)
+            if bucket is None:
+                bucket = self._buckets[bucket_id] = []
+                heapq.heappush(self._bucket_heap, bucket_id)
+            bucket.append(key)
+            self._expiry[key] = expires_at
+            return True
+
+    def _make_room(self, now):
+        #: Expired keys can always go. Earlier buckets have already been
+        #: dropped, so only the front bucket can still hold any.
+        if self._bucket_heap:
+            bucket_id = self._bucket_heap[0]
+            bucket = self._buckets[bucket_id]
+            live = []
+            for key in bucket:
+                if not self._in_bucket(key, bucket_id):
+                    continue
+                if self._expiry[key] <= now:
+                    del self._expiry[key]
+                else:
+                    live.append(key)
+            bucket[:] = live
+        if len(self._expiry) < self.max_entries:
+            return
+        if self.on_full == "reject":
+            raise ValueError("Replay index is full.")
+        while self._expiry and len(self._expiry) >= self.max_entries:
+            self._drop_bucket(heapq.heappop(self._bucket_heap))
+
+    def _evict_expired(self, now):
+        #: A bucket is only dropped once every key in it has expired
+        while self._bucket_heap and (
+            (self._bucket_heap[0] + 1) * self.bucket_seconds <= now
+        ):
+            self._drop_bucket(heapq.heappop(self._bucket_heap))
+
+    def _drop_bucket(self, bucket_id):
+        for key in self._buckets.pop(bucket_id):
+            #: A key re-added after expiring may now be in a later bucket
+            if self._in_bucket(key, bucket_id):
+                self._expiry.pop(key, None)
+
+    def _in_bucket(self, key, bucket_id):
+        expires_at = self._expiry.get(key)
+        return expires_at is not None and (
+            int(expires_at // self.bucket_seconds) == bucket_id
+        )
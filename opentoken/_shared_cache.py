@@ -0,0 +1,285 @@
+"""Cross-process verified token cache
+"""
+
+import hashlib
+import hmac
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+_MAGIC = b"OTKCACH1"
+_FILE_HEADER = struct.Struct("<8sII")
+_FILE_HEADER_SIZE = 64
+
+#: Slot layout: sequence, digest, expiry, data length, HMAC, data
+_SEQ = struct.Struct("<I")
+_SLOT_HEADER = struct.Struct("<I32sdH32s")
+_RECORD = struct.Struct("<32sdH")
+
+#: Prefer a memory-backed directory for anonymous tables
+_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+class SharedTokenCache:
+    """Fixed-size hash table of verified tokens in shared memory.
+
+    The table lives in a memory-mapped file, or in an anonymous shared
+    mapping inherited by forked workers when no path is given, so every
+    worker on a host reads and populates the same entries. Slots are
+    addressed by a SHA-256 digest of the key with a short linear probe,
+    and a slot is reused once its entry has expired.
+
+    Writers take an exclusive ``fcntl.lockf`` lock on the byte range of the
+    slot they update, without waiting, and skip the write if another
+    worker holds it. Readers take no lock: each slot carries a sequence
+    number that writers make odd while they update it, and readers treat an
+    odd or changed sequence number as a miss. On platforms without
+    ``fcntl`` the cache is read-only and ``put`` always returns False.
+
+    Every entry is authenticated with an HMAC-SHA256 under a secret given
+    by the caller, and an entry whose HMAC does not verify is a miss, so a
+    process that can write the table cannot forge entries for callers
+    whose secret it does not know. An existing backing file is only opened
+    if it is a regular file owned by the current user with no group or
+    other permissions.
+
+    Args:
+        path (str): Path of the backing file. If None, an unlinked
+            temporary file is used, which must be created before the
+            workers fork.
+        slots (int): Number of slots in the table.
+        slot_size (int): Size of a slot in bytes, which bounds the size of
+            the cached data.
+        probes (int): Number of slots examined per lookup.
+        clock (callable): Function returning the current epoch time.
+
+    """
+
+    def __init__(self, path=None, slots=65536, slot_size=512, probes=4,
+                 clock=time.time):
+        if slots < 1:
+            raise ValueError("slots must be at least 1.")
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError("slot_size must be greater than {0}.".format(
+                _SLOT_HEADER.size
+            ))
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.probes = min(probes, slots)
+        self.max_data_size = min(slot_size - _SLOT_HEADER.size, 0xFFFF)
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        #: lockf locks belong to the process, so threads also need a lock
+        self._write_lock = threading.Lock()
+
+        size = _FILE_HEADER_SIZE + slots * slot_size
+        if path is None:
+            self._file = tempfile.TemporaryFile(dir=_SHM_DIR)
+            fd = self._file.fileno()
+        else:
+            self._file = None
+            fd = os.open(
+                path,
+                os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0),
+                0o600
+            )
+            try:
+                _check_owner(fd, path)
+            except ValueError:
+                os.close(fd)
+                raise
+        self._fd = fd
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._mmap = mmap.mmap(fd, size)
+
+        magic, file_slots, file_slot_size = _FILE_HEADER.unpack_from(
+            self._mmap, 0
+        )
+        if magic == b"\x00" * len(_MAGIC):
+            _FILE_HEADER.pack_into(self._mmap, 0, _MAGIC, slots, slot_size)
+        elif (magic, file_slots, file_slot_size) != (_MAGIC, slots, slot_size):
+            self.close()
+            raise ValueError(
+                "Cache file {0} has a different layout.".format(path)
+            )
+
+    @property
+    def hit_rate(self):
+        """float: Fraction of lookups in this process that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key, secret):
+        """Look up an entry.
+
+        Args:
+            key (bytes): Cache key.
+            secret (bytes): Secret the entry was stored with.
+
+        Returns:
+            tuple: The expiry epoch timestamp (float) and data (bytes), or
+            None on a miss.
+
+        """
+        digest = hashlib.sha256(key).digest()
+        now = self._clock()
+        for offset in self._probe(digest):
+            entry = self._read(offset, secret)
+            if entry is not None and entry[0] == digest:
+                if entry[1] > now:
+                    self.hits += 1
+                    return entry[1], entry[2]
+                break
+        self.misses += 1
+        return None
+
+    def put(self, key, expires_at, data, secret):
+        """Store an entry.
+
+        Args:
+            key (bytes): Cache key.
+            expires_at (float): Epoch timestamp after which the entry is no
+                longer returned and its slot may be reused.
+            data (bytes): Data to cache.
+            secret (bytes): Secret used to authenticate the entry.
+
+        Returns:
+            bool: True if the entry was stored.
+
+        """
+        if fcntl is None or len(data) > self.max_data_size:
+            return False
+        digest = hashlib.sha256(key).digest()
+        now = self._clock()
+
+        #: Prefer the slot holding this key, then a free or expired slot,
+        #: then the slot closest to expiry. Entries of other secrets cannot
+        #: be verified here, so their header is trusted for placement only.
+        target = None
+        target_expiry = None
+        for offset in self._probe(digest):
+            entry = self._read(offset)
+            if entry is None or entry[0] == digest or entry[1] <= now:
+                target = offset
+                break
+            if target is None or entry[1] < target_expiry:
+                target, target_expiry = offset, entry[1]
+
+        return self._write(target, digest, expires_at, data, secret)
+
+    def clear(self):
+        """Remove all entries, waiting for writers in other workers."""
+        length = self.slots * self.slot_size
+        with self._write_lock:
+            if fcntl is not None:
+                fcntl.lockf(
+                    self._fd, fcntl.LOCK_EX, length, _FILE_HEADER_SIZE
+                )
+            try:
+                for slot in range(self.slots):
+                    offset = _FILE_HEADER_SIZE + slot * self.slot_size
+                    seq = _SEQ.unpack_from(self._mmap, offset)[0] | 1
+                    _SEQ.pack_into(self._mmap, offset, seq)
+                    self._mmap[offset + _SEQ.size:offset + self.slot_size] = (
+                        bytes(self.slot_size - _SEQ.size)
+                    )
+                    _SEQ.pack_into(self._mmap, offset, (seq + 1) & 0xFFFFFFFF)
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(
+                        self._fd, fcntl.LOCK_UN, length, _FILE_HEADER_SIZE
+                    )
+
+    def close(self):
+        """Unmap the table and close its file."""
+        self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        else:
+            os.close(self._fd)
+
+    def _probe(self, digest):
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for i in range(self.probes):
+            yield _FILE_HEADER_SIZE + ((start + i) % self.slots) * (
+                self.slot_size
+            )
+
+    def _read(self, offset, secret=None):
+        """Read a slot, returning None if it is empty or being written, or
+        if a secret is given and the slot's HMAC does not verify.
+        """
+        seq, digest, expires_at, length, mac = _SLOT_HEADER.unpack_from(
+            self._mmap, offset
+        )
+        if seq & 1 or length > self.max_data_size:
+            return None
+        start = offset + _SLOT_HEADER.size
+        data = self._mmap[start:start + length]
+        if _SEQ.unpack_from(self._mmap, offset)[0] != seq:
+            return None
+        if secret is not None and not hmac.compare_digest(
+            mac, _mac(secret, digest, expires_at, data)
+        ):
+            return None
+        return digest, expires_at, data
+
+    def _write(self, offset, digest, expires_at, data, secret):
+        with self._write_lock:
+            try:
+                fcntl.lockf(
+                    self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, self.slot_size,
+                    offset
+                )
+            except OSError:
+                #: Another worker is writing this slot
+                return False
+            try:
+                #: An odd sequence left by a crashed writer is repaired here
+                seq = _SEQ.unpack_from(self._mmap, offset)[0] | 1
+                _SEQ.pack_into(self._mmap, offset, seq)
+                start = offset + _SLOT_HEADER.size
+                self._mmap[start:start + len(data)] = data
+                _SLOT_HEADER.pack_into(
+                    self._mmap, offset, seq, digest, expires_at, len(data),
+                    _mac(secret, digest, expires_at, data)
+                )
+                _SEQ.pack_into(self._mmap, offset, (seq + 1) & 0xFFFFFFFF)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+        return True
+
+
+def _mac(secret, digest, expires_at, data):
+    mac = hmac.new(
+        secret, _RECORD.pack(digest, expires_at, len(data)), hashlib.sha256
+    )
+    mac.update(data)
+    return mac.digest()
+
+
+def _check_owner(fd, path):
+    """Refuse a backing file that other users could read or write."""
+    info = os.fstat(fd)
+    if not stat.S_ISREG(info.st_mode):
+        raise ValueError("Cache file {0} is not a regular file.".format(path))
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise ValueError(
+            "Cache file {0} is not owned by the current user.".format(path)
+        )
+    if info.st_mode & 0o077:
+        raise ValueError(
+            "Cache file {0} is accessible to other users.".format(path)
+        )
@@ -3,17 +3,15 @@
 
 import base64
 from collections import OrderedDict
-from zlib import compress, decompress
+from zlib import decompress
 
-from Cryptodome.Cipher import AES, DES3
-from Cryptodome.Hash import SHA1, HMAC
 from Cryptodome.Random import get_random_bytes
-from Cryptodome.Util.Padding import pad, unpad
 
-from . import _ciphersuite, _utils
+from . import _backend, _ciphersuite, _compression, _utils
 
 
-def encode(payload, cipher_suite_id, password=None):
+def encode(payload, cipher_suite_id, password=None, backend=None,
+           compression=None, key=None, key_info=None):
     """Generate an OpenToken from a given payload.
 
     OTK uses a simple, line-based format for encoding the key-value pairs
@@ -24,41 +22,55 @@ def encode(payload, cipher_suite_id, password=None):
         payload (OrderedDict): Data to encrypt.
         cipher_suite_id (int): Cipher suite id.
         password (str): Password used for encryption/decryption.
+        backend (str or CryptoBackend): Crypto backend, see
+            :func:`_backend.get_backend`.
+        compression (CompressionPolicy): Payload compression policy.
+        key (bytes): Pre-derived encryption key. Derived from the password
+            when not given.
+        key_info (str or bytes): Key info written to the token header.
 
     """
     payload = _utils.validate_payload(payload)
     cipher_suite_id = _utils.validate_cipher_suite_id(cipher_suite_id)
     password = _utils.validate_password(password)
+    key_info = _utils.validate_key_info(key_info)
+    backend = _backend.get_backend(backend)
 
     cipher = _ciphersuite.CIPHERS[cipher_suite_id]
 
     otk_version = 1
-    encryption_key = _ciphersuite.generate_key(password, cipher_suite_id)
+    encryption_key = key
+    if encryption_key is None:
+        encryption_key = _ciphersuite.generate_key(
+            password, cipher_suite_id, backend=backend
+        )
     iv_length = cipher["iv_length"]
     payload = bytes(_utils.ordered_dict_to_otk_str(payload), "utf-8")
     iv = get_random_bytes(iv_length)
 
-    if cipher_suite_id == 0:
-        hmac = SHA1.new()
-    else:
-        hmac = HMAC.new(encryption_key, digestmod=SHA1)
+    hmac = backend.new_hmac(encryption_key)
     hmac.update(bytearray([otk_version]))
     hmac.update(bytearray([cipher_suite_id]))
     if iv_length > 0:
         hmac.update(iv)
+    if key_info:
+        hmac.update(key_info)
     hmac.update(payload)
     hmac_digest = hmac.digest()
 
-    zipped_data = compress(payload)
+    zipped_data = (compression or _compression.DEFAULT_POLICY).compress(
+        payload
+    )
 
-    if cipher_suite_id == 3:
-        cipher_type = DES3
-    else:
-        cipher_type = AES
-    cipher = cipher_type.new(encryption_key, cipher_type.MODE_CBC, iv=iv)
-    payload_cipher_text = cipher.encrypt(
-        pad(zipped_data, cipher_type.block_size)
+    payload_cipher_text = backend.encrypt(
+        cipher["cipher"], encryption_key, iv, zipped_data
     )
+    if len(payload_cipher_text) > 0xFFFF:
+        raise ValueError(
+            "Token payload is too large: {0} bytes.".format(
+                len(payload_cipher_text)
+            )
+        )
 
     otk_buffer = bytearray("OTK", "utf-8")  #: OTK literal
     otk_buffer.append(1)  #: Version identifier
@@ -67,7 +79,11 @@ def encode(payload, cipher_suite_id, password=None):
     otk_buffer.append(iv_length)  #: IV Length
     if iv_length > 0:
         otk_buffer.extend(iv)  #: IV
-    otk_buffer.append(0)  #: Key info length
+    if key_info:
+        otk_buffer.append(len(key_info))  #: Key info length
+        otk_buffer.extend(key_info)  #: Key info
+    else:
+        otk_buffer.append(0)  #: Key info length
     otk_buffer.extend(
         int(len(payload_cipher_text)).to_bytes(
             2, byteorder="big", signed=False
@@ -79,19 +95,114 @@ def encode(payload, cipher_suite_id, password=None):
     return _utils.reformat_to_otk_b64(otk)
 
 
-def decode(otk, cipher_suite_id, password=None):
+def decode(otk, cipher_suite_id, password=None, backend=None, key=None,
+           object_pairs_hook=OrderedDict):
     """Decode an OpenToken.
 
     Args:
         otk (str): Base64 encoded OpenToken with "*" padding chars.
         cipher_suite_id (int): Cipher suite id.
         password (str): Password used for encryption/decryption.
+        backend (str or CryptoBackend): Crypto backend, see
+            :func:`_backend.get_backend`.
+        key (bytes): Pre-derived decryption key. Derived from the password
+            when not given.
+        object_pairs_hook (callable): Called with the decoded key-value
+            pairs to build the returned mapping.
 
     """
     cipher_suite_id = _utils.validate_cipher_suite_id(cipher_suite_id)
     password = _utils.validate_password(password)
+    backend = _backend.get_backend(backend)
+
+    (otk_version, otk_cipher_suite_id, hmac, iv, key_info,
+     payload_cipher_text) = _unpack(otk)
+
+    if otk_cipher_suite_id != cipher_suite_id:
+        raise ValueError(
+            "CipherID, {0}, doesn't match the encoding cipher, {1}.".format(
+                otk_cipher_suite_id, cipher_suite_id
+            )
+        )
+
+    #: Select a key for decryption
+    decryption_key = key
+    if decryption_key is None:
+        decryption_key = _ciphersuite.generate_key(
+            password, cipher_suite_id, backend=backend
+        )
+
+    #: Decrypt the payload cipher-text using the selected cipher suite
+    cipher = _ciphersuite.CIPHERS[cipher_suite_id]
+    try:
+        zipped_data = backend.decrypt(
+            cipher["cipher"], decryption_key, iv, payload_cipher_text
+        )
+    except ValueError:
+        raise ValueError("Error decrypting token.")
+
+    #: Decompress the decrypted payload in accordance with RFC1950 and RFC1951
+    payload = decompress(zipped_data)
+
+    #: Initialize an HMAC using the SHA-1 algorithm and the following data -
+    #: OTK Version, Cipher Suite Value, IV value, Key info value (if present)
+    hmac_test = backend.new_hmac(decryption_key)
+    hmac_test.update(bytearray([otk_version]))
+    hmac_test.update(bytearray([cipher_suite_id]))
+    if iv:
+        hmac_test.update(iv)
+    if key_info:
+        hmac_test.update(key_info)
+    hmac_test.update(payload)
+
+    #: Compare reconstructed HMAC with original HMAC
+    if hmac_test.hexdigest() != hmac.hex():
+        raise ValueError("HMAC does not match.")
+
+    return object_pairs_hook(_utils.otk_str_to_pairs(payload.decode()))
+
+
+def read_header(otk):
+    """Read the routing fields of an OpenToken header without decrypting it.
+
+    Args:
+        otk (str): Base64 encoded OpenToken with "*" padding chars.
+
+    Returns:
+        tuple: The cipher suite id (int) and key info (bytes or None).
 
-    decryption_key = _ciphersuite.generate_key(password, cipher_suite_id)
+    """
+    _, cipher_suite_id, _, _, key_info, _ = _unpack(otk)
+    return cipher_suite_id, key_info
+
+
+def read_hmac(otk):
+    """Read the HMAC of an OpenToken without decrypting it.
+
+    The HMAC covers the random IV, so it identifies a token regardless of
+    how its base64 text is spelled.
+
+    Args:
+        otk (str): Base64 encoded OpenToken with "*" padding chars.
+
+    Returns:
+        bytes: The 20 byte SHA-1 HMAC.
+
+    """
+    return bytes(_unpack(otk)[2])
+
+
+def _unpack(otk):
+    """Split an OpenToken into its fields and validate the header.
+
+    Args:
+        otk (str): Base64 encoded OpenToken with "*" padding chars.
+
+    Returns:
+        tuple: OTK version, cipher suite id, HMAC, IV, key info and
+        payload cipher text.
+
+    """
     otk = _utils.reformat_from_otk_b64(otk)
     read_index = 0
     otk = bytearray(base64.urlsafe_b64decode(otk))
@@ -110,15 +221,8 @@ def decode(otk, cipher_suite_id, password=None):
     if otk_version != 1:
         raise ValueError("Invalid OTK version.")
 
-    #: Validate CipherSuite id
     otk_cipher_suite_id = int.from_bytes(otk[read_index:read_index + 1], "big")
     read_index += 1
-    if otk_cipher_suite_id != cipher_suite_id:
-        raise ValueError(
-            "CipherID, {0}, doesn't match the encoding cipher, {1}.".format(
-                otk_cipher_suite_id, cipher_suite_id
-            )
-        )
 
     #: Extract cipher, mac and iv information
     hmac = otk[read_index:read_index + 20]
@@ -130,53 +234,21 @@ def decode(otk, cipher_suite_id, password=None):
         iv = otk[read_index:read_index + iv_length]
         read_index += iv_length
 
-    #: Extract the Key Info (if present) and select a key for decryption
+    #: Extract the Key Info (if present)
     key_info_length = int.from_bytes(otk[read_index:read_index + 1], "big")
     read_index += 1
     key_info = None
     if key_info_length > 0:
-        key_info = otk[read_index:read_index + key_info_length]
+        key_info = bytes(otk[read_index:read_index + key_info_length])
         read_index += key_info_length
 
-    #: Decrypt the payload cipher-text using the selected cipher suite
-    payload_cipher_text = None
     payload_length = int.from_bytes(
         otk[read_index:read_index + 2], "big", signed=False
     )
     read_index += 2
     payload_cipher_text = otk[read_index:read_index + payload_length]
 
-    if cipher_suite_id == 3:
-        cipher_type = DES3
-    else:
-        cipher_type = AES
-    cipher = cipher_type.new(decryption_key, cipher_type.MODE_CBC, iv=iv)
-    try:
-        zipped_data = unpad(
-            cipher.decrypt(payload_cipher_text), cipher_type.block_size
-        )
-    except ValueError:
-        raise ValueError("Error decrypting token.")
-
-    #: Decompress the decrypted payload in accordance with RFC1950 and RFC1951
-    payload = decompress(zipped_data)
-
-    #: Initialize an HMAC using the SHA-1 algorithm and the following data -
-    #: OTK Version, Cipher Suite Value, IV value, Key info value (if present)
-    if cipher_suite_id == 0:
-        hmac_test = SHA1.new()
-    else:
-        hmac_test = HMAC.new(decryption_key, digestmod=SHA1)
-    hmac_test.update(bytearray([otk_version]))
-    hmac_test.update(bytearray([cipher_suite_id]))
-    if iv_length > 0:
-        hmac_test.update(iv)
-    if key_info:
-        hmac_test.update(key_info)
-    hmac_test.update(payload)
-
-    #: Compare reconstructed HMAC with original HMAC
-    if hmac_test.hexdigest() != hmac.hex():
-        raise ValueError("HMAC does not match.")
-
-    return _utils.otk_str_to_ordered_dict(payload.decode())
+    return (
+        otk_version, otk_cipher_suite_id, hmac, iv, key_info,
+        payload_cipher_text
+    )
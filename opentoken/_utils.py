@@ -42,6 +42,27 @@ def validate_password(password):
     return password
 
 
+def validate_key_info(key_info):
+    """Validate and reformat the key info argument.
+
+    Args:
+        key_info (str or bytes): Key info for the token header.
+
+    Returns:
+        bytes or None: The key info as bytes, or None if empty.
+
+    """
+    if not key_info:
+        return None
+    if isinstance(key_info, str):
+        key_info = key_info.encode("utf-8")
+    if not isinstance(key_info, bytes):
+        raise TypeError("Invalid key info type")
+    if len(key_info) > 255:
+        raise ValueError("Key info must be at most 255 bytes.")
+    return key_info
+
+
 def validate_payload(payload):
     """Validate that the payload is of type OrderedDict.
     If the payload is of type str, then it assumes that the string is
@@ -124,7 +145,19 @@ def otk_str_to_ordered_dict(otk_str):
     Returns:
         OrderedDict: OrderedDict representation of the token.
 
+    """
+    return OrderedDict(otk_str_to_pairs(otk_str))
+
+
+def otk_str_to_pairs(otk_str):
+    """Converts an OpenToken string to a list of key-value pairs.
+
+    Args:
+        otk_str (str): String representation of the token.
+
+    Returns:
+        list: The key-value pairs of the token as tuples.
+
     """
     items = otk_str.split("\n")
-    pairs = [tuple(line.split("=")) for line in items]
-    return OrderedDict(pairs)
+    return [tuple(line.split("=")) for line in items]
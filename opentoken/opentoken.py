@@ -2,11 +2,12 @@
 """
 
 import datetime
+import hashlib
+import time
 from collections import OrderedDict
 
-import dateutil.parser
-
-from . import _token
+from . import _ciphersuite, _claims, _token, _utils
+from ._claims import Claims
 
 
 class OpenToken:
@@ -18,16 +19,44 @@ class OpenToken:
         token_tolerance (int): Token tolerance.
         token_lifetime (int): Token lifetime.
         token_renewal (int): Token renewal.
+        replay_index (ReplayBackend): Optional index used to reject tokens
+            that have already been parsed.
+        replay_claim (str): Claim used as the replay key. Defaults to the
+            token HMAC.
+        crypto_backend (str): Crypto backend name, "pycryptodome" or
+            "cryptography". Defaults to cryptography when installed.
+        compression (CompressionPolicy): Payload compression policy used by
+            create_token.
+        key_info (str or bytes): Key info written to the header of created
+            tokens, used by receivers to select a key.
+        compact_claims (bool): Return parsed tokens as memory-efficient
+            Claims instead of OrderedDict.
+        issuance_cache (IssuanceCache): Optional cache used by create_token
+            to return a recently minted token for an identical claim set.
+        verified_cache (SharedTokenCache): Optional cache of verified
+            tokens, which can be shared by the worker processes of a host.
 
     """
 
     def __init__(self, password=None, cipher_suite_id=2, token_tolerance=120,
-                 token_lifetime=300, token_renewal=43200):
+                 token_lifetime=300, token_renewal=43200, replay_index=None,
+                 replay_claim=None, crypto_backend=None, compression=None,
+                 key_info=None, compact_claims=False, issuance_cache=None,
+                 verified_cache=None):
         self.cipher_suite_id = cipher_suite_id
         self.password = password
         self.token_tolerance = token_tolerance
         self.token_lifetime = token_lifetime
         self.token_renewal = token_renewal
+        self.replay_index = replay_index
+        self.replay_claim = replay_claim
+        self.crypto_backend = crypto_backend
+        self.compression = compression
+        self.key_info = key_info
+        self.compact_claims = compact_claims
+        self.issuance_cache = issuance_cache
+        self.verified_cache = verified_cache
+        self._derived_key = None
 
     def parse_token(self, otk_str):
         """Parse an OpenToken and apply basic validation checks.
@@ -36,23 +65,59 @@ class OpenToken:
             otk_str (str): The raw base64 encoded token string.
 
         Returns:
-            OrderedDict: The key-value token pairs.
+            OrderedDict or Claims: The key-value token pairs.
+
+        """
+        object_pairs_hook = Claims if self.compact_claims else OrderedDict
+        cached = None
+        if self.verified_cache is not None:
+            cache_key = self._verified_cache_key(otk_str)
+            cache_secret = self._get_key() or b""
+            cached = self.verified_cache.get(cache_key, cache_secret)
+
+        if cached is not None:
+            expires_at, payload = cached
+            parsed_token = object_pairs_hook(
+                _utils.otk_str_to_pairs(payload.decode("utf-8"))
+            )
+        else:
+            parsed_token, expires_at = self._verify(
+                otk_str, object_pairs_hook
+            )
+            if self.verified_cache is not None:
+                payload = _utils.ordered_dict_to_otk_str(parsed_token)
+                self.verified_cache.put(
+                    cache_key, expires_at, payload.encode("utf-8"),
+                    cache_secret
+                )
+
+        if self.replay_index is not None:
+            self._check_replay(otk_str, parsed_token, expires_at)
+
+        return parsed_token
+
+    def _verify(self, otk_str, object_pairs_hook):
+        """Decode a token and check its subject and validity period.
+
+        Returns:
+            tuple: The key-value token pairs and the epoch timestamp after
+            which the token is no longer valid.
 
         """
         parsed_token = _token.decode(
-            otk_str, self.cipher_suite_id, self.password
+            otk_str, self.cipher_suite_id, self.password,
+            backend=self.crypto_backend, key=self._get_key(),
+            object_pairs_hook=object_pairs_hook
         )
 
         if "subject" not in parsed_token.keys():
             raise ValueError("OpenToken missing 'subject'.")
 
-        not_before = dateutil.parser.isoparse(parsed_token['not-before'])
-        not_on_or_after = dateutil.parser.isoparse(
-            parsed_token['not-on-or-after']
+        not_before, not_on_or_after, renew_until = _claims.timestamps(
+            parsed_token
         )
-        renew_until = dateutil.parser.isoparse(parsed_token['renew-until'])
-        now = datetime.datetime.now(datetime.timezone.utc)
-        tolerance = now + datetime.timedelta(seconds=self.token_tolerance)
+        now = time.time()
+        tolerance = now + self.token_tolerance
 
         if not_before > not_on_or_after:
             raise ValueError(
@@ -76,13 +141,36 @@ class OpenToken:
                 )
             )
 
-        return parsed_token
+        return parsed_token, min(not_on_or_after, renew_until)
+
+    def _verified_cache_key(self, otk_str):
+        """Build the verified cache key. Entries are authenticated with the
+        derived key, so the password is left out and another tenant's entry
+        for the same token is simply a miss.
+        """
+        return "{0}:{1}".format(self.cipher_suite_id, otk_str).encode("utf-8")
+
+    def _check_replay(self, otk_str, parsed_token, expires_at):
+        if self.replay_claim is None:
+            #: The raw string is not unique per token, as base64 decoding
+            #: skips stray characters and trailing bytes are ignored
+            replay_key = _token.read_hmac(otk_str).hex()
+        elif self.replay_claim in parsed_token:
+            replay_key = parsed_token[self.replay_claim]
+        else:
+            raise ValueError("OpenToken missing '{0}'.".format(
+                self.replay_claim
+            ))
+
+        if not self.replay_index.check_and_add(replay_key, expires_at):
+            raise ValueError("This token has already been used.")
 
     def create_token(self, otk_pairs):
         """Create an OpenToken from an object of key-value pairs to encode.
 
         Args:
-            otk_pairs (list): The key-value token pairs as a list of tuples.
+            otk_pairs (list or Mapping): The key-value token pairs as a list
+                of tuples, or a mapping such as Claims.
 
         Returns:
             str: The raw base64 encoded token string.
@@ -93,6 +181,12 @@ class OpenToken:
         if "subject" not in otk_dict.keys():
             raise ValueError("OpenToken missing 'subject'.")
 
+        if self.issuance_cache is not None:
+            cache_key = self._issuance_key(otk_dict)
+            token = self.issuance_cache.get(cache_key)
+            if token is not None:
+                return token
+
         now = datetime.datetime.now(datetime.timezone.utc)
         expiry = now + datetime.timedelta(seconds=self.token_lifetime)
         renew_until = now + datetime.timedelta(seconds=self.token_renewal)
@@ -101,4 +195,51 @@ class OpenToken:
         otk_dict['not-on-or-after'] = expiry.isoformat().split(".")[0] + "Z"
         otk_dict['renew-until'] = renew_until.isoformat().split(".")[0] + "Z"
 
-        return _token.encode(otk_dict, self.cipher_suite_id, self.password)
+        token = _token.encode(
+            otk_dict, self.cipher_suite_id, self.password,
+            backend=self.crypto_backend, compression=self.compression,
+            key=self._get_key(), key_info=self.key_info
+        )
+
+        if self.issuance_cache is not None:
+            #: Timestamps are encoded with whole-second precision
+            issued_at = int(now.timestamp())
+            self.issuance_cache.put(
+                cache_key, token, issued_at, issued_at + self.token_lifetime
+            )
+
+        return token
+
+    def _issuance_key(self, otk_dict):
+        """Build the issuance cache key, which covers the claim set as it is
+        encoded and every setting that affects the minted token. Timestamp
+        claims are replaced on every issue, and the key material is only
+        included as a digest.
+        """
+        key_digest = hashlib.sha256(self._get_key() or b"").digest()
+        return (
+            key_digest, self.cipher_suite_id, self.crypto_backend,
+            self.key_info, self.token_lifetime, self.token_renewal,
+            tuple(
+                ("{0}".format(k), "{0}".format(v))
+                for k, v in otk_dict.items()
+                if k not in _claims.TIMESTAMP_CLAIMS
+            )
+        )
+
+    def _get_key(self):
+        """Derive the encryption key once and reuse it until the password,
+        cipher suite or backend changes.
+        """
+        config = (self.password, self.cipher_suite_id, self.crypto_backend)
+        derived_key = self._derived_key
+        if derived_key is None or derived_key[0] != config:
+            derived_key = (config, _ciphersuite.generate_key(
+                self.password, self.cipher_suite_id,
+                backend=self.crypto_backend
+            ))
+            self._derived_key = derived_key
+        return derived_key[1]
+
+    def _clear_key(self):
+        self._derived_key = None
@@ -24,6 +24,9 @@ setuptools.setup(
     package_dir={"opentoken": "opentoken"},
     python_requires=">=3.5",
     install_requires=requires,
+    extras_require={
+        "cryptography": ["cryptography"],
+    },
     license="MIT",
     tests_require=test_requirements,
     classifiers=[
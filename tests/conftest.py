@@ -0,0 +1,18 @@
+"""Shared test fixtures
+"""
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """A clock stopped at epoch 1000, advanced by setting ``now``."""
+    return FakeClock()
@@ -0,0 +1,124 @@
+"""Unit tests for _backend.py
+"""
+
+import base64
+from collections import OrderedDict
+from unittest.mock import patch
+
+import pytest
+
+from opentoken import _backend, _ciphersuite, _token
+
+requires_cryptography = pytest.mark.skipif(
+    _backend._Cipher is None, reason="requires cryptography"
+)
+
+BACKENDS = [
+    "pycryptodome",
+    pytest.param("cryptography", marks=requires_cryptography),
+]
+
+#: (cipher suite id, base64 key, iv, expected token)
+VECTORS = [
+    (
+        1,
+        "a66C9MvM8eY4qJKyCXKW+19PWDeuc3thDyuiumak+Dc=",
+        b'\xd2\x01\x9c-j\xe7\xeaQ\xf7\xfb\x19\x05\xd3\x8e\xf5\x81',
+        "T1RLAQEujlLGEvmVKDKyvL1vaZ27qMYhTxDSAZwtaufqUff7GQXTjvWBAAAgJJGPta7"
+        "VOITap4uDZ_OkW_Kt4yYZ4BBQzw_NR2CNE-g*",
+    ),
+    (
+        2,
+        "a66C9MvM8eY4qJKyCXKW+w==",
+        b"\x1b\xf7z\'v\xf71\xee\xc6:\xb3\x8e\x1e\xb33j",
+        "T1RLAQK9THj0okLTUB663QrJFg5qA58IDhAb93ondvcx7sY6s44eszNqAAAga5W8Dc4"
+        "XZwtsZ4qV3_lDI-Zn2_yadHHIhkGqNV5J9kw*",
+    ),
+    (
+        3,
+        "a66C9MvM8eY4qJKyCXKW+19PWDeuc3th",
+        b'jJ<\xbe\xa4\xd2i~',
+        "T1RLAQNoCsuAwybXOSBpIc9ZvxQVx_3fhghqSjy-pNJpfgAAGGlGgJ79NhX43lLRXAb"
+        "9Mp5unR7XFWopzw**",
+    ),
+]
+
+PAYLOAD = OrderedDict([
+    ("foo", "bar"),
+    ("bar", "baz"),
+])
+
+
+class TestGetBackend:
+    @pytest.mark.parametrize("name", BACKENDS)
+    def test_by_name(self, name):
+        assert _backend.get_backend(name).name == name
+
+    def test_instance(self):
+        backend = _backend.PycryptodomeBackend()
+        assert _backend.get_backend(backend) is backend
+
+    def test_default(self):
+        expected = (
+            "cryptography" if _backend._Cipher is not None
+            else "pycryptodome"
+        )
+        assert _backend.get_backend().name == expected
+
+    def test_unknown(self):
+        with pytest.raises(ValueError) as err:
+            _backend.get_backend("foo")
+        assert str(err.value) == "Unknown crypto backend: foo"
+
+
+class TestCrossBackend:
+    @requires_cryptography
+    @pytest.mark.parametrize("password", ["", "testPassword", b"\x00\xff"])
+    def test_derive_key(self, password):
+        for cipher_suite_id in (1, 2, 3):
+            keys = {
+                _ciphersuite.generate_key(
+                    password, cipher_suite_id, backend=name
+                )
+                for name in ("pycryptodome", "cryptography")
+            }
+            assert len(keys) == 1
+
+    @pytest.mark.parametrize("name", BACKENDS)
+    @pytest.mark.parametrize("cipher_suite_id,key,iv,expected", VECTORS)
+    def test_encode_vectors(self, name, cipher_suite_id, key, iv, expected):
+        with patch("opentoken._token.get_random_bytes") as iv_mock, \
+                patch("opentoken._ciphersuite.generate_key") as key_mock:
+            iv_mock.return_value = bytearray(iv)
+            key_mock.return_value = base64.standard_b64decode(key)
+            otk = _token.encode(PAYLOAD, cipher_suite_id, backend=name)
+        assert otk == expected
+
+    @pytest.mark.parametrize("name", BACKENDS)
+    @pytest.mark.parametrize("cipher_suite_id,key,iv,expected", VECTORS)
+    def test_decode_vectors(self, name, cipher_suite_id, key, iv, expected):
+        with patch("opentoken._ciphersuite.generate_key") as key_mock:
+            key_mock.return_value = base64.standard_b64decode(key)
+            payload = _token.decode(expected, cipher_suite_id, backend=name)
+        assert payload == PAYLOAD
+
+    @requires_cryptography
+    @pytest.mark.parametrize("encoder,decoder", [
+        ("pycryptodome", "cryptography"),
+        ("cryptography", "pycryptodome"),
+    ])
+    def test_round_trip(self, encoder, decoder):
+        for cipher_suite_id in (1, 2):
+            otk = _token.encode(
+                PAYLOAD, cipher_suite_id, "testPassword", backend=encoder
+            )
+            assert _token.decode(
+                otk, cipher_suite_id, "testPassword", backend=decoder
+            ) == PAYLOAD
+
+    @pytest.mark.parametrize("name", BACKENDS)
+    def test_bad_padding(self, name):
+        backend = _backend.get_backend(name)
+        cipher_text = backend.encrypt("AES", b"k" * 16, b"i" * 16, b"data")
+        with pytest.raises(ValueError):
+            backend.decrypt("AES", b"K" * 16, b"i" * 16, cipher_text)
@@ -0,0 +1,68 @@
+"""Unit tests for _claims.py
+"""
+
+import pickle
+from collections import OrderedDict
+
+import pytest
+
+from opentoken import _claims
+
+
+class TestClaims:
+    pairs = [
+        ("subject", "foobar"),
+        ("foo", "bar"),
+        ("not-before", "2020-01-02T03:04:05Z"),
+        ("not-on-or-after", "2020-01-02T03:09:05Z"),
+        ("renew-until", "2020-01-02T15:04:05Z"),
+    ]
+
+    def test_mapping(self):
+        claims = _claims.Claims(self.pairs)
+        assert claims["subject"] == "foobar"
+        assert claims.get("missing") is None
+        assert claims.get("foo") == "bar"
+        assert "foo" in claims
+        assert len(claims) == 5
+        assert list(claims.items()) == self.pairs
+        assert claims == OrderedDict(self.pairs)
+        with pytest.raises(KeyError):
+            claims["missing"]
+
+    def test_timestamps(self):
+        claims = _claims.Claims(self.pairs)
+        assert claims.not_before == 1577934245.0
+        assert claims.not_on_or_after == 1577934545.0
+        assert claims.renew_until == 1577977445.0
+        assert _claims.timestamps(claims) == _claims.timestamps(
+            OrderedDict(self.pairs)
+        )
+
+    def test_missing_timestamps(self):
+        claims = _claims.Claims([("subject", "foobar")])
+        assert claims.not_before is None
+        with pytest.raises(KeyError):
+            _claims.timestamps(claims)
+
+    def test_shared_schema(self):
+        first = _claims.Claims(self.pairs)
+        second = _claims.Claims(OrderedDict(self.pairs))
+        assert first._keys is second._keys
+        assert first._index is second._index
+
+    def test_no_instance_dict(self):
+        claims = _claims.Claims(self.pairs)
+        assert not hasattr(claims, "__dict__")
+
+    def test_repeated_claims(self):
+        pairs = [("a", "1"), ("b", "2"), ("a", "3")]
+        assert list(_claims.Claims(pairs).items()) == list(
+            OrderedDict(pairs).items()
+        )
+
+    def test_pickle(self):
+        claims = _claims.Claims(self.pairs)
+        restored = pickle.loads(pickle.dumps(claims))
+        assert restored == claims
+        assert restored.renew_until == claims.renew_until
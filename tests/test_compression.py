@@ -0,0 +1,61 @@
+"""Unit tests for _compression.py
+"""
+
+import zlib
+
+import pytest
+
+from opentoken import _compression
+
+
+class TestCompressionPolicy:
+    payload = b"subject=foobar\nfoo=bar\nbar=baz" * 20
+
+    def test_default_matches_zlib(self):
+        policy = _compression.DEFAULT_POLICY
+        assert policy.compress(self.payload) == zlib.compress(self.payload)
+
+    def test_rfc1950_stream(self):
+        policy = _compression.CompressionPolicy(
+            level=9, mem_level=9, wbits=9
+        )
+        zipped = policy.compress(self.payload)
+        assert zipped[0] & 0x0F == zlib.DEFLATED
+        assert zlib.decompress(zipped) == self.payload
+
+    def test_size_levels(self):
+        policy = _compression.CompressionPolicy(
+            level=9, size_levels=[(256, 1), (64, 0)]
+        )
+        assert policy.level_for(10) == 0
+        assert policy.level_for(100) == 1
+        assert policy.level_for(1000) == 9
+        assert zlib.decompress(policy.compress(b"a=b")) == b"a=b"
+
+    @pytest.mark.parametrize("wbits", [15, 12])
+    def test_size_levels_applied(self, wbits):
+        policy = _compression.CompressionPolicy(
+            level=9, wbits=wbits, size_levels=[(64, 1), (256, 4)]
+        )
+        #: FLEVEL, the top two bits of the second byte, records the level
+        assert policy.compress(b"a=b")[1] >> 6 == 0
+        assert policy.compress(self.payload[:200])[1] >> 6 == 1
+        assert policy.compress(self.payload)[1] >> 6 == 3
+
+    def test_invalid_level(self):
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(level=10)
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(size_levels=[(64, -2)])
+
+    def test_invalid_mem_level(self):
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(mem_level=0)
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(mem_level=10)
+
+    def test_invalid_wbits(self):
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(wbits=-15)
+        with pytest.raises(ValueError):
+            _compression.CompressionPolicy(wbits=31)
@@ -0,0 +1,57 @@
+"""Unit tests for _issuance.py
+"""
+
+import pytest
+
+from opentoken import _issuance
+
+
+class TestIssuanceCache:
+    def test_hit_and_miss(self, clock):
+        cache = _issuance.IssuanceCache(clock=clock)
+        assert cache.get("a") is None
+        cache.put("a", "token", 1000, 1300)
+        assert cache.get("a") == "token"
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert cache.hit_rate == 0.5
+
+    def test_min_remaining(self, clock):
+        cache = _issuance.IssuanceCache(min_remaining=0.25, clock=clock)
+        cache.put("a", "token", 1000, 1400)
+        clock.now = 1299
+        assert cache.get("a") == "token"
+        clock.now = 1300
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_evicts_stale_from_front(self, clock):
+        cache = _issuance.IssuanceCache(min_remaining=0.5, clock=clock)
+        cache.put("a", "token-a", 1000, 1300)
+        cache.put("b", "token-b", 1100, 1400)
+        clock.now = 1160
+        assert cache.get("b") == "token-b"
+        assert len(cache) == 1
+
+    def test_max_size(self, clock):
+        cache = _issuance.IssuanceCache(max_size=2, clock=clock)
+        cache.put("a", "token-a", 1000, 1300)
+        cache.put("b", "token-b", 1000, 1300)
+        cache.put("c", "token-c", 1000, 1300)
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        assert cache.get("c") == "token-c"
+
+    def test_clear(self, clock):
+        cache = _issuance.IssuanceCache(clock=clock)
+        cache.put("a", "token", 1000, 1300)
+        cache.get("a")
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 0
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            _issuance.IssuanceCache(max_size=0)
+        with pytest.raises(ValueError):
+            _issuance.IssuanceCache(min_remaining=1.5)
@@ -1,9 +1,14 @@
 """Unit tests for opentoken.py
 """
 
+from unittest.mock import patch
+
 import pytest
 
-from opentoken import opentoken
+from opentoken import (
+    Claims, CompressionPolicy, IssuanceCache, MemoryReplayIndex,
+    SharedTokenCache, _backend, _ciphersuite, _token, opentoken
+)
 
 
 class TestOpenToken:
@@ -73,3 +78,177 @@ class TestOpenToken:
         assert str(err.value).startswith(
             "This token is past its renewal limit,"
         ) is True
+
+    def test_replay_rejected(self):
+        otkapi = opentoken.OpenToken(
+            password="testPassword", replay_index=MemoryReplayIndex()
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        assert otkapi.parse_token(token)["subject"] == "foobar"
+        with pytest.raises(ValueError) as err:
+            otkapi.parse_token(token)
+        assert str(err.value) == "This token has already been used."
+
+    @pytest.mark.parametrize("mangle", [
+        lambda token: token[:10] + "!" + token[10:],
+        lambda token: "!" + token,
+        lambda token: token[:10] + "\n" + token[10:],
+    ])
+    def test_replay_mangled_copy(self, mangle):
+        otkapi = opentoken.OpenToken(
+            password="testPassword", replay_index=MemoryReplayIndex()
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        otkapi.parse_token(token)
+        with pytest.raises(ValueError) as err:
+            otkapi.parse_token(mangle(token))
+        assert str(err.value) == "This token has already been used."
+
+    def test_replay_claim(self):
+        otkapi = opentoken.OpenToken(
+            password="testPassword", replay_index=MemoryReplayIndex(),
+            replay_claim="session-id"
+        )
+        otkapi.parse_token(otkapi.create_token([
+            ("subject", "foobar"), ("session-id", "1")
+        ]))
+        with pytest.raises(ValueError) as err:
+            otkapi.parse_token(otkapi.create_token([
+                ("subject", "foobar"), ("session-id", "1")
+            ]))
+        assert str(err.value) == "This token has already been used."
+        with pytest.raises(ValueError) as err:
+            otkapi.parse_token(otkapi.create_token([
+                ("subject", "foobar")
+            ]))
+        assert str(err.value) == "OpenToken missing 'session-id'."
+
+    def test_compression_policy(self):
+        otkapi = opentoken.OpenToken(
+            password="testPassword",
+            compression=CompressionPolicy(level=9, size_levels=[(128, 1)])
+        )
+        backend = _backend.get_backend()
+        cipher = _ciphersuite.CIPHERS[otkapi.cipher_suite_id]["cipher"]
+        for subject, flevel in (("foobar", 0), ("foobar" * 50, 3)):
+            token = otkapi.create_token([
+                ("subject", subject)
+            ])
+            assert otkapi.parse_token(token)["subject"] == subject
+            _, _, _, iv, _, payload_cipher_text = _token._unpack(token)
+            zipped_data = backend.decrypt(
+                cipher, otkapi._get_key(), iv, payload_cipher_text
+            )
+            #: FLEVEL, the top two bits of the second byte, records the level
+            assert zipped_data[1] >> 6 == flevel
+
+    def test_derived_key_reused(self):
+        otkapi = opentoken.OpenToken(password="testPassword")
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        with patch("opentoken._ciphersuite.generate_key") as generate_key:
+            otkapi.parse_token(token)
+        generate_key.assert_not_called()
+        otkapi.password = "otherPassword"
+        with pytest.raises(ValueError):
+            otkapi.parse_token(token)
+
+    def test_compact_claims(self):
+        otkapi = opentoken.OpenToken(
+            password="testPassword", compact_claims=True
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        parsed_token = otkapi.parse_token(token)
+        assert isinstance(parsed_token, Claims)
+        assert parsed_token["subject"] == "foobar"
+        assert parsed_token.not_before <= parsed_token.not_on_or_after
+        token = otkapi.create_token(parsed_token)
+        assert otkapi.parse_token(token)["subject"] == "foobar"
+
+    def test_issuance_cache(self):
+        cache = IssuanceCache()
+        otkapi = opentoken.OpenToken(
+            password="testPassword", issuance_cache=cache
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        assert otkapi.create_token([("subject", "foobar")]) == token
+        assert otkapi.create_token([("subject", "other")]) != token
+        otkapi.password = "otherPassword"
+        assert otkapi.create_token([("subject", "foobar")]) != token
+        assert cache.hits == 1
+        assert cache.misses == 3
+
+    def test_issuance_cache_parsed_claims(self):
+        cache = IssuanceCache()
+        otkapi = opentoken.OpenToken(
+            password="testPassword", issuance_cache=cache,
+            compact_claims=True
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        parsed_token = otkapi.parse_token(token)
+        assert otkapi.create_token(parsed_token) == token
+        assert cache.hits == 1
+        for cache_key in cache._entries:
+            assert "testPassword" not in cache_key
+
+    def test_verified_cache(self):
+        cache = SharedTokenCache(slots=16)
+        otkapi = opentoken.OpenToken(
+            password="testPassword", verified_cache=cache,
+            replay_index=MemoryReplayIndex()
+        )
+        worker = opentoken.OpenToken(
+            password="testPassword", verified_cache=cache
+        )
+        token = otkapi.create_token([
+            ("subject", "foobar")
+        ])
+        assert otkapi.parse_token(token)["subject"] == "foobar"
+        with patch("opentoken._token.decode") as decode:
+            parsed_token = worker.parse_token(token)
+        decode.assert_not_called()
+        assert parsed_token["subject"] == "foobar"
+        assert cache.hits == 1
+        with pytest.raises(ValueError) as err:
+            otkapi.parse_token(token)
+        assert str(err.value) == "This token has already been used."
+        other = opentoken.OpenToken(
+            password="otherPassword", verified_cache=cache
+        )
+        with pytest.raises(ValueError):
+            other.parse_token(token)
+
+    def test_verified_cache_forged_entry(self, tmp_path):
+        path = str(tmp_path / "cache")
+        otkapi = opentoken.OpenToken(
+            password="testPassword", verified_cache=SharedTokenCache(path)
+        )
+        token = otkapi.create_token([
+            ("subject", "alice")
+        ])
+        otkapi.parse_token(token)
+
+        #: Someone able to write the file rewrites the cached claims
+        forger = SharedTokenCache(path)
+        cache_key = otkapi._verified_cache_key(token)
+        expires_at, payload = forger.get(cache_key, otkapi._get_key())
+        forger.put(
+            cache_key, expires_at,
+            payload.replace(b"subject=alice", b"subject=admin"), b"guess"
+        )
+
+        worker = opentoken.OpenToken(
+            password="testPassword", verified_cache=SharedTokenCache(path)
+        )
+        assert worker.parse_token(token)["subject"] == "alice"
@@ -0,0 +1,81 @@
+"""Unit tests for _registry.py
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from opentoken import _ciphersuite, _registry, _token
+
+
+class TestOpenTokenRegistry:
+    def make_registry(self, **kwargs):
+        registry = _registry.OpenTokenRegistry(**kwargs)
+        registry.register("acme", "acmePassword", 2, key_info="acme")
+        registry.register("globex", "globexPassword", 2, key_info="globex")
+        registry.register("initech", "initechPassword", 1)
+        return registry
+
+    def test_dispatch(self):
+        registry = self.make_registry()
+        for name in ("acme", "globex", "initech"):
+            token = registry.create_token(name, [("subject", name)])
+            tenant, parsed = registry.parse_token(token)
+            assert tenant == name
+            assert parsed["subject"] == name
+
+    def test_dispatch_without_trial_decryption(self):
+        registry = self.make_registry()
+        token = registry.create_token("globex", [("subject", "foobar")])
+        globex_key = _ciphersuite.generate_key("globexPassword", 2)
+        with patch("opentoken._token.decode",
+                   wraps=_token.decode) as decode:
+            registry.parse_token(token)
+        decode.assert_called_once()
+        args, kwargs = decode.call_args
+        assert args[:3] == (token, 2, "globexPassword")
+        assert kwargs["key"] == globex_key
+
+    def test_unmatched(self):
+        registry = self.make_registry()
+        registry.unregister("acme")
+        other = _registry.OpenTokenRegistry()
+        other.register("acme", "acmePassword", 2, key_info="acme")
+        token = other.create_token("acme", [("subject", "foobar")])
+        with pytest.raises(ValueError) as err:
+            registry.parse_token(token)
+        assert str(err.value) == (
+            "No tenant registered for cipher suite 2 with key info b'acme'."
+        )
+        assert registry.unmatched == 1
+
+    def test_duplicate_route(self):
+        registry = self.make_registry()
+        with pytest.raises(ValueError):
+            registry.register("acme", "password", 3)
+        with pytest.raises(ValueError):
+            registry.register("hooli", "password", 2, key_info=b"acme")
+
+    def test_lru_key_eviction(self):
+        registry = self.make_registry(max_derived_keys=2)
+        for name in ("acme", "globex", "initech"):
+            registry.create_token(name, [("subject", name)])
+        assert registry.get("acme")._derived_key is None
+        assert registry.get("globex")._derived_key is not None
+        assert registry.get("initech")._derived_key is not None
+        token = registry.create_token("acme", [("subject", "acme")])
+        assert registry.parse_token(token)[0] == "acme"
+        assert registry.get("globex")._derived_key is None
+
+    def test_stats(self):
+        registry = self.make_registry()
+        token = registry.create_token("acme", [("subject", "foobar")])
+        registry.parse_token(token)
+        with pytest.raises(ValueError):
+            registry.create_token("acme", [("no-subject", "foobar")])
+        stats = registry.stats()
+        assert stats["acme"]["created"] == 1
+        assert stats["acme"]["parsed"] == 1
+        assert stats["acme"]["errors"] == 1
+        assert stats["acme"]["throughput"] > 0
+        assert stats["globex"]["throughput"] == 0
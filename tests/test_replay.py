@@ -0,0 +1,77 @@
+"""Unit tests for _replay.py
+"""
+
+import pytest
+
+from opentoken import _replay
+
+
+class TestMemoryReplayIndex:
+    def test_rejects_replay(self, clock):
+        index = _replay.MemoryReplayIndex(clock=clock)
+        assert index.check_and_add("a", 1100.0) is True
+        assert index.check_and_add("a", 1100.0) is False
+        assert index.check_and_add("b", 1100.0) is True
+
+    def test_evicts_expired_buckets(self, clock):
+        index = _replay.MemoryReplayIndex(bucket_seconds=10, clock=clock)
+        index.check_and_add("a", 1005.0)
+        index.check_and_add("b", 1055.0)
+        clock.now = 1010.0
+        assert "a" not in index
+        assert "b" in index
+        assert len(index) == 1
+        assert index.check_and_add("a", 1050.0) is True
+
+    def test_expired_key_reused(self, clock):
+        index = _replay.MemoryReplayIndex(bucket_seconds=10, clock=clock)
+        assert index.check_and_add("sess", 1005.0) is True
+        clock.now = 1006.0
+        assert "sess" not in index
+        assert index.check_and_add("sess", 1300.0) is True
+        assert index.check_and_add("sess", 1300.0) is False
+        #: Dropping the old bucket keeps the new entry
+        clock.now = 1020.0
+        assert "sess" in index
+        assert index.check_and_add("sess", 1300.0) is False
+
+    def test_already_expired_not_stored(self, clock):
+        index = _replay.MemoryReplayIndex(clock=clock)
+        assert index.check_and_add("a", 999.0) is True
+        assert len(index) == 0
+
+    def test_max_entries_rejects(self, clock):
+        index = _replay.MemoryReplayIndex(
+            bucket_seconds=10, max_entries=2, clock=clock
+        )
+        index.check_and_add("a", 1005.0)
+        index.check_and_add("b", 1025.0)
+        with pytest.raises(ValueError) as err:
+            index.check_and_add("c", 1035.0)
+        assert str(err.value) == "Replay index is full."
+        assert index.check_and_add("a", 1005.0) is False
+        clock.now = 1005.0
+        assert index.check_and_add("c", 1035.0) is True
+        assert "a" not in index
+
+    def test_max_entries_evict(self, clock):
+        index = _replay.MemoryReplayIndex(
+            bucket_seconds=10, max_entries=2, on_full="evict",
+            clock=clock
+        )
+        index.check_and_add("a", 1005.0)
+        index.check_and_add("b", 1025.0)
+        index.check_and_add("c", 1035.0)
+        assert len(index) == 2
+        assert "a" not in index
+        assert "c" in index
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            _replay.MemoryReplayIndex(bucket_seconds=0)
+        with pytest.raises(ValueError):
+            _replay.MemoryReplayIndex(on_full="ignore")
+
+    def test_backend_interface(self):
+        with pytest.raises(NotImplementedError):
+            _replay.ReplayBackend().check_and_add("a", 0)
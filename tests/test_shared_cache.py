@@ -0,0 +1,223 @@
+"""Unit tests for _shared_cache.py
+"""
+
+import os
+
+import pytest
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from opentoken import _shared_cache
+
+SECRET = b"secret"
+
+
+class TestSharedTokenCache:
+    def test_get_and_put(self, clock):
+        cache = _shared_cache.SharedTokenCache(slots=16, clock=clock)
+        assert cache.get(b"a", SECRET) is None
+        assert cache.put(b"a", 1300.0, b"subject=foobar", SECRET) is True
+        assert cache.get(b"a", SECRET) == (1300.0, b"subject=foobar")
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert cache.hit_rate == 0.5
+
+    def test_expiry(self, clock):
+        cache = _shared_cache.SharedTokenCache(slots=16, clock=clock)
+        cache.put(b"a", 1300.0, b"data", SECRET)
+        clock.now = 1300.0
+        assert cache.get(b"a", SECRET) is None
+
+    def test_expired_slot_reuse(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=1, probes=1, clock=clock
+        )
+        cache.put(b"a", 1300.0, b"data-a", SECRET)
+        clock.now = 1400.0
+        assert cache.put(b"b", 1500.0, b"data-b", SECRET) is True
+        assert cache.get(b"b", SECRET) == (1500.0, b"data-b")
+
+    def test_replaces_soonest_expiry(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=2, probes=2, clock=clock
+        )
+        cache.put(b"a", 1300.0, b"data-a", SECRET)
+        cache.put(b"b", 1200.0, b"data-b", SECRET)
+        cache.put(b"c", 1400.0, b"data-c", SECRET)
+        assert cache.get(b"a", SECRET) == (1300.0, b"data-a")
+        assert cache.get(b"b", SECRET) is None
+        assert cache.get(b"c", SECRET) == (1400.0, b"data-c")
+
+    def test_data_too_large(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=4, slot_size=128, clock=clock
+        )
+        assert cache.put(b"a", 1300.0, b"x" * 128, SECRET) is False
+        assert cache.get(b"a", SECRET) is None
+
+    def test_torn_write_is_a_miss(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=1, probes=1, clock=clock
+        )
+        cache.put(b"a", 1300.0, b"subject=foobar", SECRET)
+        offset = _shared_cache._FILE_HEADER_SIZE
+        start = offset + _shared_cache._SLOT_HEADER.size
+        cache._mmap[start:start + 1] = b"X"
+        assert cache.get(b"a", SECRET) is None
+
+    def test_tampered_slot_is_a_miss(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=1, probes=1, clock=clock
+        )
+        cache.put(b"a", 1300.0, b"subject=alice", SECRET)
+        offset = _shared_cache._FILE_HEADER_SIZE
+        seq, digest, expires_at, _, _ = _shared_cache._SLOT_HEADER.unpack_from(
+            cache._mmap, offset
+        )
+        data = b"subject=admin"
+        start = offset + _shared_cache._SLOT_HEADER.size
+        cache._mmap[start:start + len(data)] = data
+        #: Without the secret a valid HMAC cannot be recomputed
+        _shared_cache._SLOT_HEADER.pack_into(
+            cache._mmap, offset, seq, digest, expires_at, len(data),
+            _shared_cache._mac(b"guess", digest, expires_at, data)
+        )
+        assert cache.get(b"a", SECRET) is None
+        assert cache.get(b"a", b"guess") == (1300.0, data)
+
+    def test_other_secret_is_a_miss(self, clock):
+        cache = _shared_cache.SharedTokenCache(slots=16, clock=clock)
+        cache.put(b"a", 1300.0, b"data", SECRET)
+        assert cache.get(b"a", b"other") is None
+        assert cache.get(b"a", SECRET) == (1300.0, b"data")
+
+    def test_slot_being_written_is_a_miss(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=1, probes=1, clock=clock
+        )
+        cache.put(b"a", 1300.0, b"data", SECRET)
+        offset = _shared_cache._FILE_HEADER_SIZE
+        _shared_cache._SEQ.pack_into(cache._mmap, offset, 3)
+        assert cache.get(b"a", SECRET) is None
+        #: No writer holds the slot lock, so the odd sequence is repaired
+        assert cache.put(b"a", 1300.0, b"data", SECRET) is True
+        assert cache.get(b"a", SECRET) == (1300.0, b"data")
+
+    @pytest.mark.skipif(
+        not hasattr(os, "fork") or fcntl is None,
+        reason="requires fork and fcntl"
+    )
+    def test_locked_slot_is_skipped(self, tmp_path, clock):
+        path = str(tmp_path / "cache")
+        cache = _shared_cache.SharedTokenCache(
+            path, slots=1, probes=1, clock=clock
+        )
+        offset = _shared_cache._FILE_HEADER_SIZE
+        ready_r, ready_w = os.pipe()
+        done_r, done_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            fcntl.lockf(cache._fd, fcntl.LOCK_EX, cache.slot_size, offset)
+            os.write(ready_w, b"x")
+            os.read(done_r, 1)
+            os._exit(0)
+        os.read(ready_r, 1)
+        try:
+            assert cache.put(b"a", 1300.0, b"data", SECRET) is False
+        finally:
+            os.write(done_w, b"x")
+            os.waitpid(pid, 0)
+        assert cache.put(b"a", 1300.0, b"data", SECRET) is True
+        cache.close()
+
+    @pytest.mark.skipif(
+        not hasattr(os, "fork") or fcntl is None,
+        reason="requires fork and fcntl"
+    )
+    def test_racing_writers(self, clock):
+        cache = _shared_cache.SharedTokenCache(
+            slots=1, probes=1, clock=clock
+        )
+        expected = {
+            b"a": b"subject=alice\n" * 20,
+            b"b": b"subject=bob\n" * 25,
+        }
+        pids = []
+        for key in expected:
+            pid = os.fork()
+            if pid == 0:
+                for _ in range(3000):
+                    cache.put(key, 1300.0, expected[key], SECRET)
+                os._exit(0)
+            pids.append(pid)
+
+        while pids:
+            for key, data in expected.items():
+                entry = cache.get(key, SECRET)
+                assert entry is None or entry == (1300.0, data)
+            pids = [pid for pid in pids if not os.waitpid(pid, os.WNOHANG)[0]]
+        entries = [cache.get(key, SECRET) for key in expected]
+        assert (1300.0, expected[b"a"]) in entries or (
+            (1300.0, expected[b"b"]) in entries
+        )
+
+    def test_clear(self, clock):
+        cache = _shared_cache.SharedTokenCache(slots=4, clock=clock)
+        cache.put(b"a", 1300.0, b"data", SECRET)
+        cache.clear()
+        assert cache.get(b"a", SECRET) is None
+        assert cache.put(b"a", 1300.0, b"data", SECRET) is True
+
+    def test_shared_file(self, tmp_path, clock):
+        path = str(tmp_path / "cache")
+        writer = _shared_cache.SharedTokenCache(
+            path, slots=16, clock=clock
+        )
+        reader = _shared_cache.SharedTokenCache(
+            path, slots=16, clock=clock
+        )
+        writer.put(b"a", 1300.0, b"data", SECRET)
+        assert reader.get(b"a", SECRET) == (1300.0, b"data")
+        with pytest.raises(ValueError):
+            _shared_cache.SharedTokenCache(path, slots=32)
+        writer.close()
+        reader.close()
+
+    def test_new_file_is_private(self, tmp_path):
+        path = str(tmp_path / "cache")
+        _shared_cache.SharedTokenCache(path, slots=4).close()
+        assert os.stat(path).st_mode & 0o077 == 0
+
+    def test_rejects_accessible_file(self, tmp_path):
+        path = str(tmp_path / "cache")
+        _shared_cache.SharedTokenCache(path, slots=4).close()
+        os.chmod(path, 0o666)
+        with pytest.raises(ValueError) as err:
+            _shared_cache.SharedTokenCache(path, slots=4)
+        assert str(err.value) == (
+            "Cache file {0} is accessible to other users.".format(path)
+        )
+
+    @pytest.mark.skipif(
+        not hasattr(os, "O_NOFOLLOW"), reason="requires O_NOFOLLOW"
+    )
+    def test_rejects_symlink(self, tmp_path):
+        target = str(tmp_path / "target")
+        _shared_cache.SharedTokenCache(target, slots=4).close()
+        path = str(tmp_path / "cache")
+        os.symlink(target, path)
+        with pytest.raises(OSError):
+            _shared_cache.SharedTokenCache(path, slots=4)
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_shared_across_fork(self, clock):
+        cache = _shared_cache.SharedTokenCache(slots=16, clock=clock)
+        pid = os.fork()
+        if pid == 0:
+            cache.put(b"a", 1300.0, b"data", SECRET)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert cache.get(b"a", SECRET) == (1300.0, b"data")
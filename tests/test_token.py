@@ -2,12 +2,13 @@
 """
 
 import base64
+import os
 from collections import OrderedDict
 from unittest.mock import patch
 
 import pytest
 
-from opentoken import _token, _utils
+from opentoken import _ciphersuite, _token, _utils
 
 
 class TestToken:
@@ -144,3 +145,33 @@ class TestToken:
         expected_otk = "T1RLAQNoCsuAwybXOSBpIc9ZvxQVx_3fhghqSjy-" \
                        "pNJpfgAAGGlGgJ79NhX43lLRXAb9Mp5unR7XFWopzw**"
         assert otk == expected_otk
+
+    def test_encode_payload_too_large(self):
+        payload = OrderedDict([
+            ("k{0}".format(i), os.urandom(48).hex())
+            for i in range(2000)
+        ])
+        with pytest.raises(ValueError) as err:
+            _token.encode(payload, 2, "testPassword")
+        assert str(err.value).startswith("Token payload is too large")
+
+    def test_key_info_round_trip(self):
+        otk = _token.encode(
+            self.canonical_payload, 2, "testPassword", key_info="tenant"
+        )
+        assert _token.read_header(otk) == (2, b"tenant")
+        assert _token.decode(otk, 2, "testPassword") == self.canonical_payload
+
+    def test_encode_decode_with_key(self):
+        key = _ciphersuite.generate_key("testPassword", 2)
+        otk = _token.encode(self.canonical_payload, 2, key=key)
+        assert _token.decode(otk, 2, "testPassword") == self.canonical_payload
+        assert _token.decode(otk, 2, key=key) == self.canonical_payload
+
+    def test_read_hmac(self):
+        otk = _token.encode(self.canonical_payload, 2, "testPassword")
+        otk_hmac = _token.read_hmac(otk)
+        assert len(otk_hmac) == 20
+        assert _token.read_hmac(otk[:10] + "!" + otk[10:]) == otk_hmac
+        other = _token.encode(self.canonical_payload, 2, "testPassword")
+        assert _token.read_hmac(other) != otk_hmac
@@ -51,3 +51,12 @@ class TestValidations:
             (3, "v3"),
         ]))
         assert od == "key1=val1\nkey2=val2\n3=v3"
+
+    def test_key_info_validations(self):
+        assert _utils.validate_key_info(None) is None
+        assert _utils.validate_key_info("") is None
+        assert _utils.validate_key_info("abc") == b"abc"
+        with pytest.raises(TypeError):
+            _utils.validate_key_info(3)
+        with pytest.raises(ValueError):
+            _utils.validate_key_info(b"a" * 256)